@@ -10,6 +10,12 @@ import pandas as pd
 from shapely import wkt
 import time
 import math
+import sqlite3
+from tile_index import (
+    TILE_COVERAGE_COLUMNS, TILE_SUMMARY_COLUMNS, format_bbox, quadkey_to_bbox,
+    update_tile_index, query_tile_index, query_tile_coverage, get_hot_cells,
+    get_tile_index_stats
+)
 
 # ============================================================================
 # PAGE CONFIGURATION
@@ -96,6 +102,9 @@ if 'current_results' not in st.session_state:
 if 'bbox_input' not in st.session_state:
     st.session_state.bbox_input = "8.405,48.985,8.410,48.990"  # Very small default
 
+if 'show_overview' not in st.session_state:
+    st.session_state.show_overview = False
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -119,12 +128,17 @@ def parse_bbox(bbox_input):
     except ValueError:
         return None, "Invalid coordinates"
 
+OVERLAP_COLUMNS = ['building_a_id', 'building_b_id', 'a_lon', 'a_lat']
+BUILDING_COLUMNS = ['osm_id', 'osm_type', 'wkt_geom', 'building_type', 'name']
+
 def build_simple_overlap_query(west, south, east, north, limit=20):
     """Very simple query to find overlapping buildings"""
     return f"""
 SELECT 
     a.osm_id as building_a_id,
-    b.osm_id as building_b_id
+    b.osm_id as building_b_id,
+    ST_X(ST_Centroid(a.geom)) as a_lon,
+    ST_Y(ST_Centroid(a.geom)) as a_lat
 FROM postpass_polygon a
 JOIN postpass_polygon b ON a.osm_id < b.osm_id 
 WHERE a.tags ? 'building' 
@@ -209,6 +223,14 @@ def execute_query(query, timeout=30):
     except Exception as e:
         return None, f"Error: {str(e)}"
 
+def is_header_only(data_rows, columns):
+    """Check for a CSV with headers but no rows, i.e. a real empty result"""
+    return (
+        isinstance(data_rows, list) and len(data_rows) == 1
+        and isinstance(data_rows[0], list)
+        and [col.strip() for col in data_rows[0]] == columns
+    )
+
 def create_dataframe_safe(data_rows, headers):
     """Safely create DataFrame with proper error handling"""
     if not data_rows:
@@ -326,6 +348,127 @@ def create_geojson_from_overlaps(overlaps_df, buildings_df):
     
     return geojson
 
+# ============================================================================
+# TILE SUMMARY INDEX
+# ============================================================================
+
+def get_building_centroids(buildings_df):
+    """Map building OSM ids to (lon, lat) centroids for the tile index"""
+    centroids = {}
+    if not buildings_df.empty and 'wkt_geom' in buildings_df.columns:
+        for _, row in buildings_df.iterrows():
+            try:
+                if pd.notna(row['wkt_geom']):
+                    centroid = wkt.loads(str(row['wkt_geom'])).centroid
+                    centroids[str(row.get('osm_id', ''))] = (centroid.x, centroid.y)
+            except Exception:
+                continue
+    return centroids
+
+def get_overlap_pairs(overlaps_df):
+    """Get (building_a_id, building_b_id, lon, lat) pairs for the tile index"""
+    pairs = []
+    if not overlaps_df.empty:
+        for _, row in overlaps_df.iterrows():
+            try:
+                lon = float(row.get('a_lon', row.get('col_2')))
+                lat = float(row.get('a_lat', row.get('col_3')))
+                if math.isnan(lon) or math.isnan(lat):
+                    lon = lat = None
+            except (TypeError, ValueError):
+                lon = lat = None
+            pairs.append((
+                str(row.get('building_a_id', row.get('col_0', ''))),
+                str(row.get('building_b_id', row.get('col_1', ''))),
+                lon,
+                lat
+            ))
+    return pairs
+
+def index_scan_results(bbox, buildings_df, overlaps_df, complete):
+    """Fold a scan into the tile index, warning instead of failing"""
+    try:
+        update_tile_index(
+            bbox,
+            get_building_centroids(buildings_df),
+            get_overlap_pairs(overlaps_df),
+            complete=complete
+        )
+    except sqlite3.Error as e:
+        st.warning(f"⚠️ Could not update tile index: {str(e)[:100]}")
+
+def tile_index_dataframe(rows):
+    """Wrap tile index rows in a DataFrame"""
+    return pd.DataFrame(rows, columns=TILE_SUMMARY_COLUMNS)
+
+def tile_coverage_dataframe(rows):
+    """Wrap tile coverage rows in a DataFrame"""
+    return pd.DataFrame(rows, columns=TILE_COVERAGE_COLUMNS)
+
+def add_tile_index_layer(m, tiles_df, coverage_df=None, tooltips=True, max_fill_opacity=0.6):
+    """
+    Draw index cells on a map, shaded by overlap count.
+
+    Areas fully covered by a complete scan are drawn green underneath, as
+    are cells inside them with no overlaps; partly scanned cells are drawn
+    grey. Pass tooltips=False to keep markers drawn on top of the layer
+    hoverable.
+    """
+    layer = folium.FeatureGroup(name="Overlap index")
+    max_overlaps = tiles_df['overlap_count'].max() if not tiles_df.empty else 0
+
+    if coverage_df is not None:
+        for _, area in coverage_df.iterrows():
+            options = {}
+            if tooltips:
+                scanned = time.strftime("%Y-%m-%d %H:%M", time.localtime(area['scanned_at']))
+                options['tooltip'] = f"Fully scanned {scanned}"
+
+            folium.Rectangle(
+                bounds=[[area['south'], area['west']], [area['north'], area['east']]],
+                color="#00aa00",
+                weight=1,
+                fill=True,
+                fill_color="#00aa00",
+                fill_opacity=max_fill_opacity / 6,
+                **options
+            ).add_to(layer)
+
+    for _, cell in tiles_df.iterrows():
+        if cell['overlap_count'] > 0:
+            # Yellow for a few overlaps, red for the hottest cells
+            heat = cell['overlap_count'] / max_overlaps
+            color = f"#ff{int(204 * (1 - heat)):02x}00"
+            fill_opacity = max_fill_opacity * (0.4 + 0.6 * heat)
+        elif cell['complete']:
+            color = "#00aa00"
+            fill_opacity = max_fill_opacity / 6
+        else:
+            color = "#888888"
+            fill_opacity = max_fill_opacity / 6
+
+        options = {}
+        if tooltips:
+            scanned = time.strftime("%Y-%m-%d %H:%M", time.localtime(cell['last_scanned']))
+            coverage = "fully scanned" if cell['complete'] else "partly scanned"
+            options['tooltip'] = (
+                f"Cell {cell['quadkey']}: {cell['overlap_count']} overlaps, "
+                f"{cell['building_count']} buildings ({coverage} {scanned})"
+            )
+
+        folium.Rectangle(
+            bounds=[[cell['south'], cell['west']], [cell['north'], cell['east']]],
+            color=color,
+            weight=1,
+            fill=True,
+            fill_color=color,
+            fill_opacity=fill_opacity,
+            **options
+        ).add_to(layer)
+
+    layer.add_to(m)
+    return layer
+
 # ============================================================================
 # SIDEBAR
 # ============================================================================
@@ -385,6 +528,37 @@ with st.sidebar:
         st.session_state.current_results = None
         st.rerun()
 
+    st.divider()
+
+    # Tile index
+    st.subheader("🗂️ Tile Index")
+
+    st.session_state.show_overview = st.checkbox(
+        "Show overlap overview",
+        value=st.session_state.show_overview
+    )
+
+    try:
+        hot_cells_df = tile_index_dataframe(get_hot_cells(limit=10))
+    except sqlite3.Error as e:
+        hot_cells_df = tile_index_dataframe([])
+        st.caption(f"Tile index unavailable: {str(e)[:100]}")
+
+    if hot_cells_df.empty:
+        st.caption("No hot cells yet. Overlaps found by scans are indexed here.")
+    else:
+        hot_cell = st.selectbox(
+            "Hot cells:",
+            hot_cells_df['quadkey'].tolist(),
+            format_func=lambda quadkey: (
+                f"{quadkey} ({hot_cells_df.loc[hot_cells_df['quadkey'] == quadkey, 'overlap_count'].iloc[0]} overlaps)"
+            )
+        )
+        if st.button("🎯 Scan Hot Cell", use_container_width=True):
+            st.session_state.bbox_input = format_bbox(quadkey_to_bbox(hot_cell))
+            st.session_state.run_query = True
+            st.rerun()
+
 # ============================================================================
 # MAIN CONTENT
 # ============================================================================
@@ -402,6 +576,58 @@ st.markdown("""
 """)
 st.markdown('</div>', unsafe_allow_html=True)
 
+# Overlap overview from the tile index
+if st.session_state.show_overview:
+    st.markdown("### 🔥 Overlap Overview")
+
+    try:
+        read_start = time.perf_counter()
+        stats = get_tile_index_stats()
+        overview_df = tile_index_dataframe(query_tile_index(limit=2000))
+        coverage_df = tile_coverage_dataframe(query_tile_coverage(limit=500))
+        read_ms = (time.perf_counter() - read_start) * 1000
+    except sqlite3.Error as e:
+        st.error(f"❌ Could not read tile index: {str(e)[:100]}")
+        overview_df = tile_index_dataframe([])
+        coverage_df = tile_coverage_dataframe([])
+        stats = None
+
+    if stats and (stats['cells'] or stats['covered_areas']):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Indexed Cells", stats['cells'])
+        with col2:
+            st.metric("Hot Cells", stats['hot_cells'])
+        with col3:
+            st.metric("Buildings", stats['buildings'])
+        with col4:
+            st.metric("Overlap Pairs", stats['overlaps'])
+
+        last_scanned = time.strftime("%Y-%m-%d %H:%M", time.localtime(stats['last_scanned']))
+        st.caption(f"Index read in {read_ms:.1f} ms • last scan {last_scanned}")
+
+        try:
+            overview_map = folium.Map(width="100%", height=400)
+            add_tile_index_layer(overview_map, overview_df, coverage_df)
+            extent_df = pd.concat([overview_df, coverage_df])
+            overview_map.fit_bounds([
+                [extent_df['south'].min(), extent_df['west'].min()],
+                [extent_df['north'].max(), extent_df['east'].max()]
+            ])
+            st_folium(overview_map, width=800, height=400, key="overview_map")
+        except Exception as e:
+            st.warning(f"Overview map could not be displayed: {str(e)[:100]}")
+
+        hot_df = overview_df[overview_df['overlap_count'] > 0]
+        if not hot_df.empty:
+            with st.expander("📋 Hot Cells", expanded=False):
+                st.dataframe(
+                    hot_df[['quadkey', 'overlap_count', 'building_count', 'west', 'south', 'east', 'north']].head(50),
+                    use_container_width=True
+                )
+    elif stats is not None:
+        st.info("ℹ️ The tile index is empty. Run a scan to start filling it.")
+
 # Run query
 if 'run_query' in st.session_state and st.session_state.run_query and bbox_input:
     # Parse BBOX
@@ -441,9 +667,21 @@ if 'run_query' in st.session_state and st.session_state.run_query and bbox_input
             st.error(f"❌ {buildings_headers}")
             st.stop()
         
+        # Only a header row proves the area has no buildings; an empty
+        # or unparsable body does not
+        buildings_verified_empty = is_header_only(buildings_data, BUILDING_COLUMNS)
+        if buildings_verified_empty:
+            buildings_data = []
+        
         buildings_df = create_dataframe_safe(buildings_data, buildings_headers)
         
         if buildings_df.empty:
+            index_scan_results(
+                (west, south, east, north),
+                buildings_df,
+                pd.DataFrame(),
+                complete=buildings_verified_empty
+            )
             st.warning("⚠️ No buildings found in this area")
             st.stop()
         
@@ -462,8 +700,24 @@ if 'run_query' in st.session_state and st.session_state.run_query and bbox_input
             st.error(f"❌ {overlaps_headers}")
             st.stop()
         
-        overlaps_df = create_dataframe_safe(overlaps_data, overlaps_headers)
+        overlaps_verified_empty = is_header_only(overlaps_data, OVERLAP_COLUMNS)
+        if overlaps_verified_empty:
+            overlaps_data = []
         
+        overlaps_df = create_dataframe_safe(overlaps_data, overlaps_headers)
+
+        # Fold this scan into the tile index, including clean results
+        index_scan_results(
+            (west, south, east, north),
+            buildings_df,
+            overlaps_df,
+            complete=(
+                len(buildings_df) < max_results*2
+                and len(overlaps_df) < max_results
+                and (overlaps_verified_empty or not overlaps_df.empty)
+            )
+        )
+
         if overlaps_df.empty:
             st.info("ℹ️ No overlapping buildings found")
             st.stop()
@@ -594,6 +848,18 @@ if st.session_state.current_results:
             width="100%",
             height=400
         )
+
+        # Add indexed cells first so the markers stay on top and hoverable
+        try:
+            add_tile_index_layer(
+                m,
+                tile_index_dataframe(query_tile_index(bbox=results['bbox'])),
+                tile_coverage_dataframe(query_tile_coverage(bbox=results['bbox'])),
+                tooltips=False,
+                max_fill_opacity=0.2
+            )
+        except sqlite3.Error:
+            pass
         
         # Add AOI boundary
         folium.Rectangle(
@@ -646,7 +912,9 @@ if st.session_state.current_results:
                                 ).add_to(m)
                 except:
                     continue
-        
+
+        folium.LayerControl().add_to(m)
+
         st_folium(m, width=800, height=400)
         
     except Exception as e:
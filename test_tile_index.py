@@ -0,0 +1,271 @@
+import os
+import random
+import time
+
+import pytest
+
+from tile_index import (
+    TILE_INDEX_PATH, format_bbox, get_covered_quadkeys, get_hot_cells,
+    get_tile_index_stats, lonlat_to_quadkey, lonlat_to_tile, quadkey_to_bbox,
+    query_tile_coverage, query_tile_index, tile_to_quadkey, update_tile_index
+)
+
+# Karlsruhe, the app's default search area
+CELL = "120203233331321"
+CELL_BBOX = quadkey_to_bbox(CELL)
+
+def point_in_cell(quadkey, fx=0.5, fy=0.5):
+    """Get a point at a relative position inside a cell"""
+    west, south, east, north = quadkey_to_bbox(quadkey)
+    return west + (east - west) * fx, south + (north - south) * fy
+
+def neighbour(quadkey, dx):
+    """Get the cell dx columns to the east"""
+    lon, lat = point_in_cell(quadkey)
+    x, y = lonlat_to_tile(lon, lat)
+    return tile_to_quadkey(x + dx, y)
+
+def parse(bbox_text):
+    return tuple(float(coord) for coord in bbox_text.split(","))
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "tile_index.db")
+
+def summary(db, quadkey):
+    cells = {cell['quadkey']: cell for cell in query_tile_index(path=db)}
+    return cells.get(quadkey)
+
+# ============================================================================
+# GRID
+# ============================================================================
+
+def test_quadkey_round_trip():
+    assert lonlat_to_quadkey(8.4075, 48.9875) == CELL
+
+    west, south, east, north = CELL_BBOX
+    assert west <= 8.4075 <= east
+    assert south <= 48.9875 <= north
+    assert lonlat_to_quadkey(*point_in_cell(CELL)) == CELL
+
+def test_quadkey_encoding_matches_reference():
+    # Worked example from the Bing Maps tile system docs
+    assert tile_to_quadkey(3, 5, 3) == "213"
+    assert quadkey_to_bbox("213") == quadkey_to_bbox(tile_to_quadkey(3, 5, 3))
+
+def test_covered_quadkeys_excludes_partial_cells():
+    assert get_covered_quadkeys(*CELL_BBOX) == [CELL]
+    assert get_covered_quadkeys(8.405, 48.985, 8.410, 48.990) == []
+
+def test_covered_quadkeys_match_cell_by_cell_check():
+    bbox = (8.40, 48.98, 8.45, 49.01)
+    west, south, east, north = bbox
+    min_x, min_y = lonlat_to_tile(west, north)
+    max_x, max_y = lonlat_to_tile(east, south)
+
+    expected = []
+    for x in range(min_x, max_x + 1):
+        for y in range(min_y, max_y + 1):
+            quadkey = tile_to_quadkey(x, y)
+            cell_west, cell_south, cell_east, cell_north = quadkey_to_bbox(quadkey)
+            if cell_west >= west and cell_east <= east and cell_south >= south and cell_north <= north:
+                expected.append(quadkey)
+
+    assert expected
+    assert sorted(get_covered_quadkeys(*bbox)) == sorted(expected)
+
+def test_formatted_cell_bbox_still_covers_cell():
+    assert format_bbox(CELL_BBOX) == "8.404541,48.987427,8.415528,48.994636"
+    assert get_covered_quadkeys(*parse(format_bbox(CELL_BBOX))) == [CELL]
+
+    rng = random.Random(0)
+    for _ in range(200):
+        quadkey = lonlat_to_quadkey(rng.uniform(-179, 179), rng.uniform(-80, 80))
+        bbox = parse(format_bbox(quadkey_to_bbox(quadkey)))
+        assert quadkey in get_covered_quadkeys(*bbox)
+
+# ============================================================================
+# UPDATES
+# ============================================================================
+
+def test_index_path_does_not_depend_on_working_directory():
+    assert os.path.isabs(TILE_INDEX_PATH)
+
+def test_update_counts_buildings_and_overlaps(db):
+    centroids = {"1": point_in_cell(CELL, 0.2), "2": point_in_cell(CELL, 0.3)}
+    unlocated = update_tile_index(CELL_BBOX, centroids, [("1", "2", None, None)], complete=True, path=db)
+
+    assert unlocated == 0
+    cell = summary(db, CELL)
+    assert cell['building_count'] == 2
+    assert cell['overlap_count'] == 1
+    assert cell['complete'] == 1
+
+def test_rescan_does_not_double_count(db):
+    centroids = {"1": point_in_cell(CELL, 0.2), "2": point_in_cell(CELL, 0.3)}
+    for _ in range(3):
+        update_tile_index(CELL_BBOX, centroids, [("1", "2", None, None)], path=db)
+
+    cell = summary(db, CELL)
+    assert cell['building_count'] == 2
+    assert cell['overlap_count'] == 1
+
+def test_complete_rescan_clears_removed_buildings(db):
+    centroids = {"1": point_in_cell(CELL, 0.2), "2": point_in_cell(CELL, 0.3)}
+    update_tile_index(CELL_BBOX, centroids, [("1", "2", None, None)], complete=True, path=db)
+
+    update_tile_index(CELL_BBOX, {"1": centroids["1"]}, [], complete=True, path=db)
+
+    cell = summary(db, CELL)
+    assert cell['building_count'] == 1
+    assert cell['overlap_count'] == 0
+    assert cell['complete'] == 1
+
+def test_incomplete_rescan_keeps_existing_rows(db):
+    centroids = {"1": point_in_cell(CELL, 0.2), "2": point_in_cell(CELL, 0.3)}
+    update_tile_index(CELL_BBOX, centroids, [("1", "2", None, None)], complete=True, path=db)
+
+    update_tile_index(CELL_BBOX, {"1": centroids["1"]}, [], complete=False, path=db)
+
+    cell = summary(db, CELL)
+    assert cell['building_count'] == 2
+    assert cell['overlap_count'] == 1
+
+def test_partly_covered_cells_are_not_complete(db):
+    # The default "Tiny" area straddles two cells and covers neither
+    tiny = (8.405, 48.985, 8.410, 48.990)
+    other = lonlat_to_quadkey(8.405, 48.985)
+    assert other != CELL
+
+    centroids = {"1": (8.4075, 48.9875), "2": (8.405, 48.985)}
+    update_tile_index(tiny, centroids, [], complete=True, path=db)
+
+    assert summary(db, CELL)['complete'] == 0
+    assert summary(db, other)['complete'] == 0
+
+def test_partial_rescan_keeps_complete_flag(db):
+    update_tile_index(CELL_BBOX, {"1": point_in_cell(CELL)}, [], complete=True, path=db)
+    update_tile_index((8.405, 48.985, 8.410, 48.990), {"2": (8.4075, 48.9875)}, [], path=db)
+
+    cell = summary(db, CELL)
+    assert cell['complete'] == 1
+    assert cell['building_count'] == 2
+
+def test_unlocated_pairs_make_scan_incomplete(db):
+    update_tile_index(CELL_BBOX, {"1": point_in_cell(CELL)}, [], complete=True, path=db)
+
+    unlocated = update_tile_index(
+        CELL_BBOX, {"3": point_in_cell(CELL, 0.1)}, [("8", "9", None, None)], complete=True, path=db
+    )
+
+    assert unlocated == 1
+    cell = summary(db, CELL)
+    # Nothing was cleared and the cell is no longer reported as verified
+    assert cell['building_count'] == 2
+    assert cell['complete'] == 0
+
+def test_unlocated_pairs_do_not_mark_new_cells_complete(db):
+    unlocated = update_tile_index(
+        CELL_BBOX, {"1": point_in_cell(CELL)}, [("8", "9", None, None)], complete=True, path=db
+    )
+
+    assert unlocated == 1
+    assert summary(db, CELL)['complete'] == 0
+
+def test_incomplete_scan_writes_no_empty_cells(db):
+    bbox = quadkey_to_bbox(CELL)[:2] + quadkey_to_bbox(neighbour(CELL, 3))[2:]
+    update_tile_index(bbox, {"1": point_in_cell(CELL)}, [], complete=False, path=db)
+
+    assert [cell['quadkey'] for cell in query_tile_index(path=db)] == [CELL]
+
+def test_pairs_are_placed_by_their_own_centroid(db):
+    # Neither building came back from the buildings query
+    lon, lat = point_in_cell(CELL)
+    unlocated = update_tile_index(CELL_BBOX, {}, [("1", "2", lon, lat)], complete=True, path=db)
+
+    assert unlocated == 0
+    cell = summary(db, CELL)
+    assert cell['overlap_count'] == 1
+    assert cell['complete'] == 1
+
+def test_moved_pair_is_counted_once(db):
+    east_cell = neighbour(CELL, 1)
+    update_tile_index(CELL_BBOX, {"2": point_in_cell(east_cell)}, [("1", "2", None, None)], path=db)
+    update_tile_index(CELL_BBOX, {"1": point_in_cell(CELL)}, [("1", "2", None, None)], path=db)
+
+    assert summary(db, CELL)['overlap_count'] == 1
+    assert summary(db, east_cell)['overlap_count'] == 0
+
+    stats = get_tile_index_stats(path=db)
+    assert stats['overlaps'] == 1
+    assert stats['hot_cells'] == 1
+
+def test_moved_building_leaves_its_old_cell(db):
+    east_cell = neighbour(CELL, 1)
+    update_tile_index(CELL_BBOX, {"1": point_in_cell(east_cell)}, [], path=db)
+    update_tile_index(CELL_BBOX, {"1": point_in_cell(CELL)}, [], path=db)
+
+    assert summary(db, CELL)['building_count'] == 1
+    assert summary(db, east_cell) is None
+    assert get_tile_index_stats(path=db)['buildings'] == 1
+
+def test_complete_empty_scan_stores_coverage_not_cells(db):
+    update_tile_index(CELL_BBOX, {"1": point_in_cell(CELL)}, [], path=db)
+
+    update_tile_index(CELL_BBOX, {}, [], complete=True, path=db)
+
+    assert query_tile_index(path=db) == []
+    coverage = query_tile_coverage(path=db)
+    assert len(coverage) == 1
+    assert coverage[0]['west'] == pytest.approx(CELL_BBOX[0])
+    assert coverage[0]['north'] == pytest.approx(CELL_BBOX[3])
+
+def test_rescan_replaces_contained_coverage(db):
+    for _ in range(3):
+        update_tile_index(CELL_BBOX, {}, [], complete=True, path=db)
+
+    assert get_tile_index_stats(path=db)['covered_areas'] == 1
+
+def test_unlocated_pairs_drop_coverage(db):
+    update_tile_index(CELL_BBOX, {}, [], complete=True, path=db)
+    update_tile_index(CELL_BBOX, {}, [("8", "9", None, None)], complete=True, path=db)
+
+    assert query_tile_coverage(path=db) == []
+
+def test_large_complete_scan_is_fast_and_small(db):
+    # Roughly a province: hundreds of thousands of cells
+    bbox = (100.0, -8.0, 110.0, -4.0)
+    update_tile_index(bbox, {"1": (105.0, -6.0)}, [], path=db)
+
+    start = time.perf_counter()
+    update_tile_index(bbox, {}, [], complete=True, path=db)
+    assert time.perf_counter() - start < 1.0
+
+    stats = get_tile_index_stats(path=db)
+    assert stats['cells'] == 0
+    assert stats['buildings'] == 0
+    assert stats['covered_areas'] == 1
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+def test_queries_order_and_filter(db):
+    east_cell = neighbour(CELL, 1)
+    centroids = {
+        "1": point_in_cell(CELL, 0.2), "2": point_in_cell(CELL, 0.3),
+        "3": point_in_cell(CELL, 0.4), "4": point_in_cell(east_cell)
+    }
+    pairs = [("1", "2", None, None), ("2", "3", None, None)]
+    bbox = CELL_BBOX[:2] + quadkey_to_bbox(east_cell)[2:]
+    update_tile_index(bbox, centroids, pairs, complete=True, path=db)
+
+    assert [cell['quadkey'] for cell in get_hot_cells(path=db)] == [CELL]
+    assert [cell['quadkey'] for cell in query_tile_index(path=db)] == [CELL, east_cell]
+    assert [cell['quadkey'] for cell in query_tile_index(quadkey_to_bbox(east_cell), path=db)] == [east_cell]
+
+    stats = get_tile_index_stats(path=db)
+    assert stats['cells'] == 2
+    assert stats['hot_cells'] == 1
+    assert stats['buildings'] == 4
+    assert stats['overlaps'] == 2
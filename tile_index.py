@@ -0,0 +1,392 @@
+import math
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+# ============================================================================
+# TILE SUMMARY INDEX
+# ============================================================================
+
+# Next to the app, so it does not depend on where streamlit was started
+TILE_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tile_index.db")
+TILE_ZOOM = 15  # Quadkey level, cells are ~1.2 km wide at the equator
+MAX_TILE_LAT = 85.05112878
+BBOX_DECIMALS = 6
+COVERAGE_EPSILON = 1e-9
+
+TILE_SUMMARY_COLUMNS = [
+    'quadkey', 'west', 'south', 'east', 'north',
+    'building_count', 'overlap_count', 'complete', 'last_scanned'
+]
+
+TILE_COVERAGE_COLUMNS = ['west', 'south', 'east', 'north', 'scanned_at']
+
+# ============================================================================
+# GRID HELPERS
+# ============================================================================
+
+def lonlat_to_tile(lon, lat, zoom=TILE_ZOOM):
+    """Get the x/y of the grid cell containing a point"""
+    lat = max(min(lat, MAX_TILE_LAT), -MAX_TILE_LAT)
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def tile_to_quadkey(x, y, zoom=TILE_ZOOM):
+    """Encode tile x/y as a quadkey string"""
+    digits = []
+    for i in range(zoom, 0, -1):
+        mask = 1 << (i - 1)
+        digit = 0
+        if x & mask:
+            digit += 1
+        if y & mask:
+            digit += 2
+        digits.append(str(digit))
+    return "".join(digits)
+
+def quadkey_to_tile(quadkey):
+    """Decode a quadkey string to tile x/y"""
+    zoom = len(quadkey)
+    x = y = 0
+    for i, digit in enumerate(quadkey):
+        mask = 1 << (zoom - i - 1)
+        if digit in "13":
+            x |= mask
+        if digit in "23":
+            y |= mask
+    return x, y
+
+def lonlat_to_quadkey(lon, lat, zoom=TILE_ZOOM):
+    """Get the quadkey of the grid cell containing a point"""
+    x, y = lonlat_to_tile(lon, lat, zoom)
+    return tile_to_quadkey(x, y, zoom)
+
+def tile_to_bbox(x, y, zoom=TILE_ZOOM):
+    """Get (west, south, east, north) of tile x/y"""
+    n = 2 ** zoom
+
+    def tile_lat(ty):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    return west, tile_lat(y + 1), east, tile_lat(y)
+
+def quadkey_to_bbox(quadkey):
+    """Get (west, south, east, north) of a quadkey cell"""
+    x, y = quadkey_to_tile(quadkey)
+    return tile_to_bbox(x, y, len(quadkey))
+
+def format_bbox(bbox):
+    """
+    Format a BBOX tuple for the sidebar input.
+
+    Coordinates are rounded outward, so the formatted BBOX still covers
+    every cell the original one did.
+    """
+    west, south, east, north = bbox
+    scale = 10 ** BBOX_DECIMALS
+    rounded = (
+        math.floor(west * scale) / scale,
+        math.floor(south * scale) / scale,
+        math.ceil(east * scale) / scale,
+        math.ceil(north * scale) / scale
+    )
+    return ",".join(f"{coord:.{BBOX_DECIMALS}f}" for coord in rounded)
+
+def get_covered_tile_range(west, south, east, north, zoom=TILE_ZOOM):
+    """
+    Get (min_x, min_y, max_x, max_y) of the cells lying completely inside
+    a BBOX, or None when it does not cover a whole cell.
+    """
+    min_x, min_y = lonlat_to_tile(west, north, zoom)
+    max_x, max_y = lonlat_to_tile(east, south, zoom)
+
+    # Drop the edge rows and columns the BBOX only partly covers
+    if tile_to_bbox(min_x, min_y, zoom)[0] < west - COVERAGE_EPSILON:
+        min_x += 1
+    if tile_to_bbox(max_x, max_y, zoom)[2] > east + COVERAGE_EPSILON:
+        max_x -= 1
+    if tile_to_bbox(min_x, min_y, zoom)[3] > north + COVERAGE_EPSILON:
+        min_y += 1
+    if tile_to_bbox(max_x, max_y, zoom)[1] < south - COVERAGE_EPSILON:
+        max_y -= 1
+
+    if min_x > max_x or min_y > max_y:
+        return None
+    return min_x, min_y, max_x, max_y
+
+def get_covered_quadkeys(west, south, east, north, zoom=TILE_ZOOM):
+    """Get quadkeys of cells lying completely inside a BBOX"""
+    tile_range = get_covered_tile_range(west, south, east, north, zoom)
+    if tile_range is None:
+        return []
+
+    min_x, min_y, max_x, max_y = tile_range
+    return [
+        tile_to_quadkey(x, y, zoom)
+        for x in range(min_x, max_x + 1)
+        for y in range(min_y, max_y + 1)
+    ]
+
+# ============================================================================
+# STORAGE
+# ============================================================================
+
+def get_tile_index_connection(path=TILE_INDEX_PATH):
+    """Open the local tile index, creating tables if needed"""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+CREATE TABLE IF NOT EXISTS tile_buildings (
+    osm_id TEXT PRIMARY KEY,
+    quadkey TEXT NOT NULL,
+    tile_x INTEGER NOT NULL,
+    tile_y INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tile_overlaps (
+    building_a_id TEXT NOT NULL,
+    building_b_id TEXT NOT NULL,
+    quadkey TEXT NOT NULL,
+    tile_x INTEGER NOT NULL,
+    tile_y INTEGER NOT NULL,
+    PRIMARY KEY (building_a_id, building_b_id)
+);
+CREATE TABLE IF NOT EXISTS tile_summary (
+    quadkey TEXT PRIMARY KEY,
+    west REAL NOT NULL,
+    south REAL NOT NULL,
+    east REAL NOT NULL,
+    north REAL NOT NULL,
+    building_count INTEGER NOT NULL,
+    overlap_count INTEGER NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 0,
+    last_scanned REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tile_coverage (
+    min_x INTEGER NOT NULL,
+    min_y INTEGER NOT NULL,
+    max_x INTEGER NOT NULL,
+    max_y INTEGER NOT NULL,
+    west REAL NOT NULL,
+    south REAL NOT NULL,
+    east REAL NOT NULL,
+    north REAL NOT NULL,
+    scanned_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tile_buildings_quadkey ON tile_buildings (quadkey);
+CREATE INDEX IF NOT EXISTS idx_tile_buildings_tile ON tile_buildings (tile_x, tile_y);
+CREATE INDEX IF NOT EXISTS idx_tile_overlaps_quadkey ON tile_overlaps (quadkey);
+CREATE INDEX IF NOT EXISTS idx_tile_overlaps_tile ON tile_overlaps (tile_x, tile_y);
+CREATE INDEX IF NOT EXISTS idx_tile_summary_overlaps ON tile_summary (overlap_count);
+""")
+    return conn
+
+def update_tile_index(bbox, building_centroids, overlap_pairs, complete=False,
+                      path=TILE_INDEX_PATH):
+    """
+    Fold one scan into the tile index.
+
+    building_centroids maps OSM ids to (lon, lat) centroids. overlap_pairs
+    holds (building_a_id, building_b_id, lon, lat) tuples, where lon/lat is
+    the centroid of building A; pairs without one fall back to whichever
+    building has a known centroid. Rows are keyed by OSM id, so rescanning
+    an area never double-counts, and cells that rows move out of are
+    recounted too.
+
+    complete should only be True when the scan was not cut off by its
+    limits. Cells fully inside such a scan are cleared first, so buildings
+    removed from OSM drop out, and are marked complete in the summary. The
+    scanned cell range is kept as a coverage record, so cells left empty
+    need no summary rows. Cells the scan only partly covered keep their
+    previous complete flag.
+
+    A scan with pairs that could not be placed is never treated as complete,
+    and every indexed cell and coverage record it overlaps loses its
+    complete status, since the missing pairs may lie in any of them.
+
+    Returns the number of overlap pairs that could not be placed.
+    """
+    west, south, east, north = bbox
+    scanned_at = time.time()
+
+    building_rows = []
+    building_quadkeys = {}
+    for osm_id, (lon, lat) in building_centroids.items():
+        x, y = lonlat_to_tile(lon, lat)
+        quadkey = tile_to_quadkey(x, y)
+        building_quadkeys[str(osm_id)] = (quadkey, x, y)
+        building_rows.append((str(osm_id), quadkey, x, y))
+
+    overlap_rows = []
+    unlocated = 0
+    for building_a_id, building_b_id, lon, lat in overlap_pairs:
+        building_a_id, building_b_id = str(building_a_id), str(building_b_id)
+        if lon is not None and lat is not None:
+            x, y = lonlat_to_tile(lon, lat)
+            location = (tile_to_quadkey(x, y), x, y)
+        else:
+            location = building_quadkeys.get(building_a_id) or building_quadkeys.get(building_b_id)
+
+        if location:
+            overlap_rows.append((building_a_id, building_b_id) + location)
+        else:
+            unlocated += 1
+
+    complete = complete and unlocated == 0
+    tile_range = get_covered_tile_range(west, south, east, north) if complete else None
+    touched = {row[1] for row in building_rows} | {row[2] for row in overlap_rows}
+
+    with closing(get_tile_index_connection(path)) as conn:
+        with conn:
+            if tile_range:
+                range_params = (tile_range[0], tile_range[2], tile_range[1], tile_range[3])
+                for table in ("tile_buildings", "tile_overlaps"):
+                    where = f"FROM {table} WHERE tile_x BETWEEN ? AND ? AND tile_y BETWEEN ? AND ?"
+                    touched.update(
+                        row[0] for row in conn.execute(f"SELECT DISTINCT quadkey {where}", range_params)
+                    )
+                    conn.execute(f"DELETE {where}", range_params)
+
+                # A newer record replaces any it fully contains
+                conn.execute(
+                    "DELETE FROM tile_coverage WHERE min_x >= ? AND max_x <= ? AND min_y >= ? AND max_y <= ?",
+                    range_params
+                )
+                conn.execute(
+                    "INSERT INTO tile_coverage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    tile_range + tile_to_bbox(tile_range[0], tile_range[3])[:2]
+                    + tile_to_bbox(tile_range[2], tile_range[1])[2:] + (scanned_at,)
+                )
+
+            # Rows moving to another cell leave their old cell to recount
+            for osm_id, *_ in building_rows:
+                touched.update(row[0] for row in conn.execute(
+                    "SELECT quadkey FROM tile_buildings WHERE osm_id = ?", (osm_id,)
+                ))
+            for building_a_id, building_b_id, *_ in overlap_rows:
+                touched.update(row[0] for row in conn.execute(
+                    "SELECT quadkey FROM tile_overlaps WHERE building_a_id = ? AND building_b_id = ?",
+                    (building_a_id, building_b_id)
+                ))
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO tile_buildings (osm_id, quadkey, tile_x, tile_y) VALUES (?, ?, ?, ?)",
+                building_rows
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO tile_overlaps "
+                "(building_a_id, building_b_id, quadkey, tile_x, tile_y) VALUES (?, ?, ?, ?, ?)",
+                overlap_rows
+            )
+
+            if unlocated:
+                overlap_params = (west, east, south, north)
+                conn.execute(
+                    "UPDATE tile_summary SET complete = 0 WHERE east > ? AND west < ? AND north > ? AND south < ?",
+                    overlap_params
+                )
+                conn.execute(
+                    "DELETE FROM tile_coverage WHERE east > ? AND west < ? AND north > ? AND south < ?",
+                    overlap_params
+                )
+
+            summary_rows = []
+            for quadkey in touched:
+                x, y = quadkey_to_tile(quadkey)
+                if tile_range and tile_range[0] <= x <= tile_range[2] and tile_range[1] <= y <= tile_range[3]:
+                    cell_complete = 1
+                elif unlocated:
+                    cell_complete = 0
+                else:
+                    cell_complete = None
+                cell_west, cell_south, cell_east, cell_north = tile_to_bbox(x, y)
+                summary_rows.append((
+                    quadkey, cell_west, cell_south, cell_east, cell_north,
+                    quadkey, quadkey, cell_complete, quadkey, scanned_at
+                ))
+
+            conn.executemany("""
+INSERT OR REPLACE INTO tile_summary
+    (quadkey, west, south, east, north, building_count, overlap_count, complete, last_scanned)
+VALUES (?, ?, ?, ?, ?,
+    (SELECT COUNT(*) FROM tile_buildings WHERE quadkey = ?),
+    (SELECT COUNT(*) FROM tile_overlaps WHERE quadkey = ?),
+    COALESCE(?, (SELECT complete FROM tile_summary WHERE quadkey = ?), 0),
+    ?)
+""", summary_rows)
+
+            # Empty cells are described by coverage records instead
+            conn.execute("DELETE FROM tile_summary WHERE building_count = 0 AND overlap_count = 0")
+
+    return unlocated
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+def query_tile_index(bbox=None, min_overlaps=0, limit=500, path=TILE_INDEX_PATH):
+    """Read cell summaries from the tile index, hottest cells first"""
+    sql = f"""
+SELECT {", ".join(TILE_SUMMARY_COLUMNS)}
+FROM tile_summary
+WHERE overlap_count >= ?
+"""
+    params = [min_overlaps]
+
+    if bbox:
+        west, south, east, north = bbox
+        sql += "AND east > ? AND west < ? AND north > ? AND south < ?\n"
+        params += [west, east, south, north]
+
+    sql += "ORDER BY overlap_count DESC, building_count DESC\nLIMIT ?"
+    params.append(limit)
+
+    with closing(get_tile_index_connection(path)) as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    return [dict(zip(TILE_SUMMARY_COLUMNS, row)) for row in rows]
+
+def query_tile_coverage(bbox=None, limit=500, path=TILE_INDEX_PATH):
+    """Read areas fully covered by complete scans, newest first"""
+    sql = f"SELECT {', '.join(TILE_COVERAGE_COLUMNS)} FROM tile_coverage\n"
+    params = []
+
+    if bbox:
+        west, south, east, north = bbox
+        sql += "WHERE east > ? AND west < ? AND north > ? AND south < ?\n"
+        params += [west, east, south, north]
+
+    sql += "ORDER BY scanned_at DESC\nLIMIT ?"
+    params.append(limit)
+
+    with closing(get_tile_index_connection(path)) as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    return [dict(zip(TILE_COVERAGE_COLUMNS, row)) for row in rows]
+
+def get_hot_cells(bbox=None, limit=10, path=TILE_INDEX_PATH):
+    """Get the cells with the most known overlaps"""
+    return query_tile_index(bbox, min_overlaps=1, limit=limit, path=path)
+
+def get_tile_index_stats(path=TILE_INDEX_PATH):
+    """Get totals across the whole tile index"""
+    with closing(get_tile_index_connection(path)) as conn:
+        row = conn.execute("""
+SELECT COUNT(*), COALESCE(SUM(overlap_count > 0), 0),
+       COALESCE(SUM(building_count), 0), COALESCE(SUM(overlap_count), 0),
+       MAX(last_scanned)
+FROM tile_summary
+""").fetchone()
+        coverage = conn.execute("SELECT COUNT(*), MAX(scanned_at) FROM tile_coverage").fetchone()
+
+    return {
+        'cells': row[0],
+        'hot_cells': row[1],
+        'buildings': row[2],
+        'overlaps': row[3],
+        'covered_areas': coverage[0],
+        'last_scanned': max(filter(None, (row[4], coverage[1])), default=None)
+    }